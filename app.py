@@ -1,4 +1,5 @@
 from pathlib import Path
+import functools
 import json
 from cardcanvas import CardCanvas, Card
 from dash import (
@@ -10,16 +11,20 @@ from dash import (
     Output,
     MATCH,
     ALL,
-    Patch,
     callback_context,
+    clientside_callback,
     no_update,
 )
 import dash_mantine_components as dmc
-import plotly.express as px
+import plotly.graph_objects as go
 import plotly.io as pio
+import numpy as np
 import pandas as pd
 from dash_iconify import DashIconify
 
+# Serialize figures with orjson, it handles the numpy arrays in the figures natively
+pio.json.config.default_engine = "orjson"
+
 settings = {
     "title": "NYC Marathon",
     "subtitle": "Analyzing 2024 NYC Marathon",
@@ -29,8 +34,277 @@ settings = {
     "grid_row_height": 120,
 }
 
-data = pd.read_hdf("data.hdf", "main")
-position_data = pd.read_hdf("data.hdf", "positions")
+
+def open_store() -> pd.HDFStore:
+    """Open the data file read only, with a chunk cache large enough for a table"""
+    return pd.HDFStore("data.hdf", mode="r", CHUNK_CACHE_SIZE=64 * 1024 * 1024)
+
+
+# select() rather than store[key], which unpickles the text columns with pandas'
+# pure Python compatibility unpickler and is several times slower
+with open_store() as store:
+    data = store.select("main")
+# Text columns have few distinct values, store them as categoricals. Ordered so
+# that min/max aggregations keep working on them
+for col in data.select_dtypes(include=["object", "string"]).columns:
+    data[col] = data[col].astype("category").cat.as_ordered()
+# Shrink numeric columns to the narrowest type that holds them, so filters and
+# histograms scan fewer bytes. Two decimals are plenty for the float columns
+for col in data.columns:
+    if data[col].dtype.kind == "f":
+        data[col] = data[col].astype("float32")
+    elif data[col].dtype.kind in "iu":
+        data[col] = pd.to_numeric(data[col], downcast="integer")
+# Consolidate the blocks left behind by the column assignments
+data = data.copy()
+NUMERIC_COLS = data.select_dtypes(include="number").columns.tolist()
+NON_NUMERIC_COLS = data.select_dtypes(exclude="number").columns.tolist()
+ALL_COLS = data.columns.tolist()
+# Options for the column pickers, shared by every settings panel. Tuples, so that
+# no card can modify them in place
+NUMERIC_COL_OPTIONS = tuple(
+    {"label": column, "value": column} for column in NUMERIC_COLS
+)
+NON_NUMERIC_COL_OPTIONS = tuple(
+    {"label": column, "value": column} for column in NON_NUMERIC_COLS
+)
+ALL_COL_OPTIONS = tuple({"label": column, "value": column} for column in ALL_COLS)
+# Raw arrays behind the columns, so that filtering and binning work on NumPy
+# directly instead of going through pandas on every render
+COL_ARR = {col: np.ascontiguousarray(data[col].to_numpy()) for col in NUMERIC_COLS}
+CAT_CODES = {
+    col: data[col].cat.codes.to_numpy()
+    for col in NON_NUMERIC_COLS
+    if isinstance(data[col].dtype, pd.CategoricalDtype)
+}
+UNIQUE_CACHE: dict[tuple[int, str], pd.Index] = {}
+
+
+def unique_values(df: pd.DataFrame, column: str) -> pd.Index:
+    """Unique values of a column. Cached as the tables don't change at runtime
+
+    Kept as an Index rather than a list, plotly serializes that like the column
+    itself while a list of e.g. Timedelta objects is not JSON serializable.
+    """
+    key = (id(df), column)
+    if key not in UNIQUE_CACHE:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            UNIQUE_CACHE[key] = values.cat.categories
+        else:
+            UNIQUE_CACHE[key] = pd.Index(values.unique())
+    return UNIQUE_CACHE[key]
+
+
+GENDERS = [str(gender) for gender in unique_values(data, "gender")]
+GENDER_OPTIONS = tuple({"label": gender, "value": gender} for gender in GENDERS)
+
+# Upper limit on the number of animation frames in the racing chart
+MAX_FRAMES = 150
+# Number of markers over all frames above which the racing chart uses WebGL
+WEBGL_MIN_POINTS = 1000
+# Largest grid of counts sent in full by the histogram and heatmap. Bigger ones,
+# e.g. two text columns with thousands of values each, only send the pairs that
+# have rows in them
+MAX_DENSE_CELLS = 1_000_000
+# Figures are cached as JSON per card settings. Like every other table and cache in
+# this module they are never invalidated: the data is read once and doesn't change
+# while the app runs, so restart the app to pick up a new data file
+# Layout settings every figure starts from. The colour scheme callback swaps the
+# template in the browser
+SHARED_LAYOUT = dict(template="mantine_light", margin=dict(l=0, r=0, t=15, b=0))
+
+
+def racer_traces(
+    rows: pd.DataFrame,
+    time: float,
+    genders: pd.Categorical,
+    sizeref: float,
+    webgl: bool,
+) -> list[go.Scatter | go.Scattergl]:
+    """Marker traces of the racers in rows at the given time, one trace per gender"""
+    trace_type = go.Scattergl if webgl else go.Scatter
+    names = rows["name"].to_numpy()
+    positions = rows["position"].to_numpy()
+    counts = rows["count"].to_numpy()
+    traces = []
+    for gender in genders:
+        in_group = (rows["gender"] == gender).to_numpy()
+        traces.append(
+            trace_type(
+                x=positions[in_group],
+                y=names[in_group],
+                ids=names[in_group],
+                hovertext=names[in_group],
+                name=gender,
+                legendgroup=gender,
+                showlegend=gender != "",
+                mode="markers",
+                marker=dict(
+                    size=counts[in_group], sizemode="area", sizeref=sizeref, sizemin=5
+                ),
+                hovertemplate=(
+                    f"<b>%{{hovertext}}</b><br><br>gender={gender}<br>time={time}<br>"
+                    "position=%{x}<br>name=%{y}<br>count=%{marker.size}<extra></extra>"
+                ),
+            )
+        )
+    return traces
+
+
+def animation_args(duration: int, webgl: bool) -> dict:
+    """Arguments of the animate calls made by the racing chart's controls"""
+    # WebGL traces can't be tweened between frames, so they are redrawn instead
+    return {
+        "frame": {"duration": duration, "redraw": webgl},
+        "mode": "immediate",
+        "fromcurrent": True,
+        "transition": {"duration": 0 if webgl else duration, "easing": "linear"},
+    }
+
+
+# Only the racing chart uses the positions table, so it is read on first use rather
+# than at start up
+@functools.lru_cache(maxsize=1)
+def load_positions() -> pd.DataFrame:
+    """Positions of every racer at every time step"""
+    with open_store() as store:
+        # The racing chart only uses these, leave out the per age/gender breakdowns
+        positions = store.select("positions")[
+            ["name", "time", "position", "count", "gender"]
+        ]
+    # Racer names and genders repeat at every time step, store them as categoricals
+    return positions.astype(
+        {
+            col: "category"
+            for col in positions.select_dtypes(include=["object", "string"]).columns
+        }
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def racer_lookup() -> tuple[dict, dict]:
+    """Row positions of each racer and the time where each racer reaches the end
+
+    The row positions make a selection a few lookups instead of a scan. The end
+    time has to be found since the original data contains position data for every
+    group of people at every time step until the last person reaches the end. Rows
+    are sorted by time and only the position changes over time, so this is the
+    first row at each racer's final position.
+    """
+    position_data = load_positions()
+    by_name = position_data.groupby("name", observed=True)
+    finish_rows = position_data.loc[by_name["position"].idxmax()]
+    return by_name.indices, dict(zip(finish_rows["name"], finish_rows["time"]))
+
+
+@functools.lru_cache(maxsize=1)
+def racer_options() -> tuple[dict, ...]:
+    """Options of the racing card's racer picker"""
+    return tuple(
+        {"label": racer, "value": racer}
+        for racer in unique_values(load_positions(), "name")
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def build_racing_figure(racers: tuple[str, ...]) -> str:
+    """Build the racing figure for the given racers, cached per settings"""
+    racer_rows, last_informative_time = racer_lookup()
+    rows = [racer_rows[r] for r in racers if r in racer_rows]
+    rows = np.sort(np.concatenate(rows)) if rows else []
+    filtered_data = load_positions().iloc[rows]
+    max_time = max(
+        (last_informative_time[r] for r in racers if r in last_informative_time),
+        default=0,
+    )
+    filtered_data = filtered_data[filtered_data["time"] <= max_time]
+    # Plotly builds one frame per distinct time, so bucket dense time steps. Times
+    # are rounded up to the end of their bucket, so the start time keeps a frame of
+    # its own with every racer's start position, and each later frame shows the
+    # last position reached within its bucket
+    times = filtered_data["time"]
+    if times.nunique() > MAX_FRAMES:
+        start = times.min()
+        frame_step = (times.max() - start) / (MAX_FRAMES - 1)
+        bucket = np.ceil((times - start) / frame_step).clip(upper=MAX_FRAMES - 1)
+        filtered_data = filtered_data.assign(
+            time=(start + bucket * frame_step).round(2)
+        ).drop_duplicates(["name", "time"], keep="last")
+
+    # Marker area scales with the group size, the largest marker is 55px across,
+    # same as size_max=55 in plotly express
+    sizeref = filtered_data["count"].max() / 55**2
+    genders = filtered_data["gender"].unique()
+    # SVG gets slow beyond a thousand or so markers, switch to WebGL then
+    webgl = len(filtered_data) > WEBGL_MIN_POINTS
+    filtered_data = filtered_data.sort_values("time", kind="stable")
+    frame_times, starts = np.unique(filtered_data["time"].to_numpy(), return_index=True)
+    stops = [*starts[1:], len(filtered_data)]
+    frames = [
+        go.Frame(
+            data=racer_traces(
+                filtered_data.iloc[start:stop], frame_time, genders, sizeref, webgl
+            ),
+            name=str(frame_time),
+        )
+        for frame_time, start, stop in zip(frame_times, starts, stops)
+    ]
+    fig = go.Figure(
+        data=frames[0].data if frames else [],
+        frames=frames,
+        layout=dict(
+            SHARED_LAYOUT,
+            xaxis=dict(title="position", range=[0, 27]),
+            yaxis_title="name",
+            legend=dict(title="gender", itemsizing="constant"),
+            updatemenus=[
+                dict(
+                    type="buttons",
+                    buttons=[
+                        dict(
+                            label="&#9654;",
+                            method="animate",
+                            args=[None, animation_args(500, webgl)],
+                        ),
+                        dict(
+                            label="&#9724;",
+                            method="animate",
+                            args=[[None], animation_args(0, webgl)],
+                        ),
+                    ],
+                    direction="left",
+                    pad=dict(r=10, t=70),
+                    showactive=False,
+                    x=0.1,
+                    xanchor="right",
+                    y=0,
+                    yanchor="top",
+                )
+            ],
+            sliders=[
+                dict(
+                    active=0,
+                    currentvalue=dict(prefix="time="),
+                    len=0.9,
+                    pad=dict(b=10, t=60),
+                    x=0.1,
+                    xanchor="left",
+                    y=0,
+                    yanchor="top",
+                    steps=[
+                        dict(
+                            label=frame.name,
+                            method="animate",
+                            args=[[frame.name], animation_args(0, webgl)],
+                        )
+                        for frame in frames
+                    ],
+                )
+            ],
+        ),
+    )
+    return pio.to_json(fig)
 
 
 class RacingCard(Card):
@@ -40,32 +314,8 @@ class RacingCard(Card):
     grid_settings = {"w": 4, "h": 2, "minW": 4, "minH": 2}
 
     def render(self):
-        filtered_data = position_data.loc[
-            position_data["name"].isin(self.settings.get("racers", ["Average Person"]))
-        ]
-        # Find time where the slowest person reaches the end
-        # This has to be done since the original data contains position data for every
-        # group of people at every time step until the last person reaches the end
-        max_time = filtered_data.drop_duplicates(
-            subset=[str(col) for col in filtered_data.columns if col != "time"]
-        ).time.max() # type: ignore
-        filtered_data = filtered_data[filtered_data["time"] <= max_time]
-
-        fig = px.scatter(
-            filtered_data,
-            x="position",
-            y="name",
-            animation_frame="time",
-            animation_group="name",
-            size="count",
-            color="gender",
-            hover_name="name",
-            size_max=55,
-            range_x=[0, 27],
-            template="mantine_light",
-        )
-        fig.update_layout(margin=dict(l=0, r=0, t=15, b=0))
-        fig.update_traces(marker=dict(sizemin=5))
+        racers = tuple(sorted(self.settings.get("racers", ["Average Person"])))
+        fig = json.loads(build_racing_figure(racers))
         return dmc.Card(
             [
                 dmc.Text(
@@ -104,10 +354,7 @@ class RacingCard(Card):
                     label="Racers",
                     value=self.settings.get("racers", ["Average Person"]),
                     searchable=True,
-                    data=[
-                        {"label": racer, "value": racer}
-                        for racer in position_data["name"].unique()
-                    ],
+                    data=racer_options(),
                 ),
                 dmc.TextInput(
                     id={"type": "card-settings", "id": self.id, "sub-id": "title"},
@@ -127,6 +374,111 @@ class RacingCard(Card):
         )
 
 
+def bin_column(
+    column: str, nbins: int | None, rows: np.ndarray | slice = slice(None)
+) -> tuple[np.ndarray, np.ndarray]:
+    """Bin index of the selected rows of a column and the label of every bin
+
+    Numeric columns are split into nbins bins of equal width labelled by their
+    centers, or an automatically chosen number of bins when nbins is empty or 0.
+    Other columns get one bin per distinct value. Missing values get the bin
+    index -1.
+    """
+    if column in CAT_CODES:
+        codes = CAT_CODES[column][rows]
+        present = np.unique(codes[codes >= 0])
+        index = np.searchsorted(present, codes)
+        index[codes < 0] = -1
+        return index, data[column].cat.categories[present].to_numpy()
+    if column not in COL_ARR:
+        index, labels = pd.factorize(data[column][rows], sort=True)
+        return index, np.asarray(labels)
+    numbers = COL_ARR[column][rows]
+    valid = ~pd.isna(numbers)
+    if numbers.dtype.kind == "m":
+        # Timedeltas are binned as nanoseconds, same as plotly express does
+        numbers = numbers.view("int64")
+    edges = np.histogram_bin_edges(numbers[valid], bins=nbins or "auto")
+    index = np.searchsorted(edges, numbers, side="right") - 1
+    # The last bin also contains its right edge
+    index[numbers == edges[-1]] = len(edges) - 2
+    index[~valid] = -1
+    return index, (edges[:-1] + edges[1:]) / 2
+
+
+def count_pairs(
+    row_index: np.ndarray, col_index: np.ndarray, ncols: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Row bin, column bin and number of rows of every pair that occurs
+
+    Only pairs with rows in them are counted, so memory stays bounded by the number
+    of rows however many bins the two columns have. Pairs are sorted by row bin,
+    then column bin.
+    """
+    valid = (row_index >= 0) & (col_index >= 0)
+    pairs, counts = np.unique(
+        row_index[valid].astype(np.int64) * ncols + col_index[valid],
+        return_counts=True,
+    )
+    return pairs // ncols, pairs % ncols, counts
+
+
+def dense_counts(
+    row_bins: np.ndarray,
+    col_bins: np.ndarray,
+    counts: np.ndarray,
+    nrows: int,
+    ncols: int,
+) -> np.ndarray:
+    """Grid of the pair counts from count_pairs, zero where no rows fall"""
+    grid = np.zeros((nrows, ncols), dtype=counts.dtype)
+    grid[row_bins, col_bins] = counts
+    return grid
+
+
+@functools.lru_cache(maxsize=128)
+def build_histogram_figure(column: str, color: str | None, nbins: int) -> str:
+    """Build the histogram figure, cached per settings"""
+    index, centers = bin_column(column, nbins)
+    if color is None:
+        color_index, color_labels = np.zeros(len(index), dtype=int), [None]
+    else:
+        color_index, color_labels = bin_column(color, nbins)
+    color_bins, bins, counts = count_pairs(color_index, index, len(centers))
+    if len(color_labels) * len(centers) <= MAX_DENSE_CELLS:
+        grid = dense_counts(color_bins, bins, counts, len(color_labels), len(centers))
+        bars = [(centers, color_counts) for color_counts in grid]
+    else:
+        # One bar per bin that has rows in it, the pairs come sorted by colour
+        splits = np.searchsorted(color_bins, np.arange(1, len(color_labels)))
+        bars = [
+            (centers[color_group_bins], color_group_counts)
+            for color_group_bins, color_group_counts in zip(
+                np.split(bins, splits), np.split(counts, splits)
+            )
+        ]
+    figure = go.Figure(
+        [
+            go.Bar(
+                x=bar_x,
+                y=bar_y,
+                name=str(label),
+                showlegend=color is not None,
+            )
+            for label, (bar_x, bar_y) in zip(color_labels, bars)
+        ],
+        layout=dict(
+            SHARED_LAYOUT,
+            barmode="relative",
+            bargap=0,
+            xaxis_title=column,
+            yaxis_title="count",
+            legend_title=color,
+        ),
+    )
+    return pio.to_json(figure)
+
+
 class HistogramCard(Card):
     title = "Histogram"
     description = "This card shows a histogram of a given dataset"
@@ -137,14 +489,7 @@ class HistogramCard(Card):
         column = self.settings.get("column", "overallTimeMinutes")
         color = self.settings.get("color", None)
         nbins = self.settings.get("bins", 20)
-        figure = px.histogram(
-            data,
-            x=column,
-            color=color,
-            nbins=nbins,
-            template="mantine_light",
-        )
-        figure.update_layout(margin=dict(l=0, r=0, t=15, b=0))
+        figure = json.loads(build_histogram_figure(column, color, nbins))
         return dmc.Card(
             [
                 dmc.Text(
@@ -183,10 +528,7 @@ class HistogramCard(Card):
                     value=self.settings.get("column", "overallTimeMinutes"),
                     searchable=True,
                     # numeric columns in data
-                    data=[
-                        {"label": column, "value": column}
-                        for column in data.select_dtypes(include="number").columns
-                    ],
+                    data=NUMERIC_COL_OPTIONS,
                 ),
                 dmc.Select(
                     id={
@@ -197,10 +539,7 @@ class HistogramCard(Card):
                     label="Color",
                     value=self.settings.get("color", None),
                     searchable=True,
-                    data=[
-                        {"label": i, "value": i}
-                        for i in data.select_dtypes(exclude="number").columns
-                    ],
+                    data=NON_NUMERIC_COL_OPTIONS,
                 ),
                 dmc.NumberInput(
                     id={
@@ -230,36 +569,57 @@ class HistogramCard(Card):
         )
 
 
-def generate_filter(column: pd.Series, input_id, default_value=None):
+# Summary of every column, used to build the heatmap filters without rescanning
+# the data each time a settings panel is opened
+COLUMN_STATS: dict[str, dict] = {}
+# Columns with more distinct values than this get no heatmap filter
+MAX_FILTER_VALUES = 300
+for col in ALL_COLS:
+    values = data[col].dropna()
+    if values.dtype in ["object", "string", "bool", "category"]:
+        sorted_unique = sorted(values.unique().tolist())
+        COLUMN_STATS[col] = {"sorted_unique": sorted_unique}
+        if len(sorted_unique) <= MAX_FILTER_VALUES:
+            COLUMN_STATS[col]["options"] = tuple(
+                {"label": x, "value": x} for x in sorted_unique
+            )
+    else:
+        low, high = values.min(), values.max()
+        if values.dtype == "float32":
+            # str() keeps the short form, 3.03 rather than 3.0299999713897705
+            low, high = float(str(low)), float(str(high))
+        COLUMN_STATS[col] = {"min": low, "max": high}
+
+
+def generate_filter(column: str, input_id, default_value=None):
     """Creating a filter based on the column type and it's unique values
     Used in heatmap card to filter the data based on the column values
     """
-    column = column.dropna()
+    stats = COLUMN_STATS[column]
     card_id = input_id["id"]
     filter_type = input_id["sub-id"]
-    if column.dtype in ["object", "string", "bool", "category"]:
-        sorted_unique = sorted(column.unique().tolist())
-        if len(sorted_unique) > 300:
+    if "sorted_unique" in stats:
+        sorted_unique = stats["sorted_unique"]
+        if len(sorted_unique) > MAX_FILTER_VALUES:
             return dmc.Text(
                 "Too many unique values to show filter", fz="14px", fw=600, c="red"
             )
         return [
             dmc.Text("Filter", fz="14px", fw=600),
-            dmc.ScrollArea(
-                dmc.CheckboxGroup(
-                    id={
-                        "type": "card-settings",
-                        "id": card_id,
-                        "sub-id": f"{filter_type}-filter",
-                    },
-                    value=default_value or sorted_unique,
-                    children=dmc.Stack(
-                        [dmc.Checkbox(label=x, value=x) for x in sorted_unique]
-                    ),
-                ),
-                h=250,
+            dmc.MultiSelect(
+                id={
+                    "type": "card-settings",
+                    "id": card_id,
+                    "sub-id": f"{filter_type}-filter",
+                },
+                data=stats["options"],
+                value=default_value or sorted_unique,
+                searchable=True,
+                clearable=True,
             ),
         ]
+    if stats["max"] == stats["min"]:
+        return dmc.Text("Only one value, nothing to filter", fz="14px", fw=600)
     return [
         dmc.Text("Filter", fz="14px", fw=600),
         dmc.RangeSlider(
@@ -268,14 +628,66 @@ def generate_filter(column: pd.Series, input_id, default_value=None):
                 "id": card_id,
                 "sub-id": f"{filter_type}-filter",
             },
-            value=default_value or [column.min(), column.max()],
-            min=column.min(),
-            max=column.max(),
-            minRange=(column.max() - column.min()) / 100,
+            value=default_value or [stats["min"], stats["max"]],
+            min=stats["min"],
+            max=stats["max"],
+            minRange=(stats["max"] - stats["min"]) / 100,
         ),
     ]
 
 
+def filter_mask(column: str, column_filter: tuple) -> np.ndarray:
+    """Boolean mask of the rows passing a filter created by generate_filter"""
+    if column in CAT_CODES:
+        # Look the integer codes up in a table instead of hashing every string.
+        # The extra last entry is hit by the -1 code of missing values and of
+        # filter values that are not categories, it always stays False
+        categories = data[column].cat.categories
+        allowed = np.zeros(len(categories) + 1, dtype=bool)
+        allowed[categories.get_indexer(list(column_filter))] = True
+        allowed[-1] = False
+        return allowed[CAT_CODES[column]]
+    if column not in COL_ARR:
+        return data[column].isin(column_filter).to_numpy()
+    values = COL_ARR[column]
+    mask = values >= column_filter[0]
+    mask &= values <= column_filter[1]
+    return mask
+
+
+@functools.lru_cache(maxsize=128)
+def build_heatmap_figure(
+    x: str,
+    y: str,
+    nbinsx: int,
+    nbinsy: int,
+    x_filter: tuple | None,
+    y_filter: tuple | None,
+) -> str:
+    """Build the heatmap figure, cached per settings"""
+    # Combine both filters into one mask so the columns are only sliced once
+    mask = np.ones(len(data), dtype=bool)
+    if x_filter is not None:
+        mask &= filter_mask(x, x_filter)
+    if y_filter is not None:
+        mask &= filter_mask(y, y_filter)
+    x_index, x_labels = bin_column(x, nbinsx, mask)
+    y_index, y_labels = bin_column(y, nbinsy, mask)
+    y_bins, x_bins, counts = count_pairs(y_index, x_index, len(x_labels))
+    if len(x_labels) * len(y_labels) <= MAX_DENSE_CELLS:
+        z = dense_counts(y_bins, x_bins, counts, len(y_labels), len(x_labels))
+        heatmap = go.Heatmap(x=x_labels, y=y_labels, z=z, colorbar_title="count")
+    else:
+        heatmap = go.Heatmap(
+            x=x_labels[x_bins], y=y_labels[y_bins], z=counts, colorbar_title="count"
+        )
+    figure = go.Figure(
+        heatmap,
+        layout=dict(SHARED_LAYOUT, xaxis_title=x, yaxis_title=y),
+    )
+    return pio.to_json(figure)
+
+
 class HeatMap(Card):
     title = "Heatmap"
     description = "This card shows a heatmap of a given dataset"
@@ -289,32 +701,16 @@ class HeatMap(Card):
         y_filter = self.settings.get("y-filter", None)
         nbinsx = self.settings.get("nbinsx", 20)
         nbinsy = self.settings.get("nbinsy", 20)
-        filtered_data = data.loc[:, [x, y]]
-        if x_filter is not None:
-            if filtered_data[x].dtype in ["object", "string", "bool", "category"]:
-                filtered_data = filtered_data[filtered_data[x].isin(x_filter)]
-            else:
-                filtered_data = filtered_data[
-                    (filtered_data[x] >= x_filter[0])
-                    & (filtered_data[x] <= x_filter[1])
-                ]
-        if y_filter is not None:
-            if filtered_data[y].dtype in ["object", "string", "bool", "category"]:
-                filtered_data = filtered_data[filtered_data[y].isin(y_filter)]
-            else:
-                filtered_data = filtered_data[
-                    (filtered_data[y] >= y_filter[0])
-                    & (filtered_data[y] <= y_filter[1])
-                ]
-        figure = px.density_heatmap(
-            filtered_data,
-            x=x,
-            y=y,
-            nbinsx=nbinsx,
-            nbinsy=nbinsy,
-            template="mantine_light",
+        figure = json.loads(
+            build_heatmap_figure(
+                x,
+                y,
+                nbinsx,
+                nbinsy,
+                tuple(x_filter) if x_filter is not None else None,
+                tuple(y_filter) if y_filter is not None else None,
+            )
         )
-        figure.update_layout(margin=dict(l=0, r=0, t=15, b=0))
         return dmc.Card(
             [
                 dmc.Text(
@@ -351,9 +747,7 @@ class HeatMap(Card):
                     value=self.settings.get("x", "minutesPerKM"),
                     searchable=True,
                     # numeric columns in data
-                    data=[
-                        {"label": column, "value": column} for column in data.columns
-                    ],
+                    data=ALL_COL_OPTIONS,
                 ),
                 html.Div(
                     id={
@@ -362,7 +756,7 @@ class HeatMap(Card):
                         "container": "x-filter",
                     },
                     children=generate_filter(
-                        data[self.settings.get("x", "minutesPerKM")],
+                        self.settings.get("x", "minutesPerKM"),
                         {"type": "card-settings", "id": self.id, "sub-id": "x"},
                         default_value=self.settings.get("x-filter", None),
                     ),
@@ -376,7 +770,7 @@ class HeatMap(Card):
                     label="Y",
                     value=self.settings.get("y", "ageBand"),
                     searchable=True,
-                    data=[{"label": i, "value": i} for i in data.columns],
+                    data=ALL_COL_OPTIONS,
                 ),
                 html.Div(
                     id={
@@ -385,7 +779,7 @@ class HeatMap(Card):
                         "container": "y-filter",
                     },
                     children=generate_filter(
-                        data[self.settings.get("y", "ageBand")],
+                        self.settings.get("y", "ageBand"),
                         {"type": "card-settings", "id": self.id, "sub-id": "y"},
                         default_value=self.settings.get("y-filter", None),
                     ),
@@ -436,13 +830,11 @@ class HeatMap(Card):
     def update_filter_x(value):
         """If the column is categorical, show a dropdown to filter the data
         else if data is numeric, show a slider to filter the data"""
-        column = data[value]
-        # get the input id
+        # the triggering input's id is already parsed by dash
         ctx = callback_context
         if not ctx.triggered_id:
             return no_update
-        input_id = json.loads(ctx.triggered[0]["prop_id"].split(".")[0])
-        return generate_filter(column, input_id)
+        return generate_filter(value, ctx.triggered_id)
 
     @callback(
         Output(
@@ -451,12 +843,33 @@ class HeatMap(Card):
         Input({"type": "card-settings", "id": MATCH, "sub-id": "y"}, "value"),
     )
     def update_filter_y(value):
-        column = data[value]
         ctx = callback_context
         if not ctx.triggered_id:
             return no_update
-        input_id = json.loads(ctx.triggered[0]["prop_id"].split(".")[0])
-        return generate_filter(column, input_id)
+        return generate_filter(value, ctx.triggered_id)
+
+
+@functools.lru_cache(maxsize=128)
+def build_violin_figure(x: str, y: str) -> str:
+    """Build the violin figure, cached per settings"""
+    fig = go.Figure(
+        go.Violin(
+            x=data[x].to_numpy(),
+            y=data[y].to_numpy(),
+            name="",
+            hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>",
+        ),
+        layout=dict(
+            SHARED_LAYOUT,
+            xaxis=dict(
+                title=x,
+                categoryorder="array",
+                categoryarray=unique_values(data, x),
+            ),
+            yaxis_title=y,
+        ),
+    )
+    return pio.to_json(fig)
 
 
 class ViolinCard(Card):
@@ -468,17 +881,7 @@ class ViolinCard(Card):
     def render(self):
         x = self.settings.get("x", "ageBand")
         y = self.settings.get("y", "overallTimeMinutes")
-        fig = px.violin(
-            data,
-            x=x,
-            y=y,
-            template="mantine_light",
-        )
-        fig.update_layout(margin=dict(l=0, r=0, t=15, b=0))
-        fig.update_xaxes(
-            categoryorder="array",
-            categoryarray=data[x].unique(),
-        )
+        fig = json.loads(build_violin_figure(x, y))
         return dmc.Card(
             [
                 dmc.Text(
@@ -517,9 +920,7 @@ class ViolinCard(Card):
                     label="X",
                     value=self.settings.get("x", "ageBand"),
                     searchable=True,
-                    data=[
-                        {"label": column, "value": column} for column in data.columns
-                    ],
+                    data=ALL_COL_OPTIONS,
                 ),
                 dmc.Select(
                     id={
@@ -531,10 +932,7 @@ class ViolinCard(Card):
                     value=self.settings.get("y", "overallTimeMinutes"),
                     searchable=True,
                     # numeric columns in data
-                    data=[
-                        {"label": column, "value": column}
-                        for column in data.select_dtypes(include="number").columns
-                    ],
+                    data=NUMERIC_COL_OPTIONS,
                 ),
                 dmc.TextInput(
                     id={"type": "card-settings", "id": self.id, "sub-id": "title"},
@@ -554,6 +952,53 @@ class ViolinCard(Card):
         )
 
 
+AGGREGATIONS = ["count", "mean", "sum", "min", "max"]
+AGGREGATION_OPTIONS = tuple(
+    {"label": aggregation.capitalize(), "value": aggregation}
+    for aggregation in AGGREGATIONS
+)
+
+
+def aggregate(values: pd.Series, aggregation: str):
+    """Aggregate a column for the highlight card
+
+    Sums and means of float32 columns are accumulated in float64. float32 only
+    holds about 7 significant digits, too few for totals like the sum of all bibs.
+    """
+    if values.dtype == "float32" and aggregation in ("sum", "mean"):
+        values = values.astype("float64")
+    return values.agg(aggregation)
+
+
+# Highlight values keyed by (column, filter value, aggregation). Unfiltered values
+# are stored for every column, filtered ones for the non numeric columns
+HIGHLIGHT_CACHE: dict[tuple[str, str | None, str], object] = {}
+for col in ALL_COLS:
+    for aggregation in AGGREGATIONS:
+        try:
+            value = aggregate(data[col], aggregation)
+        except TypeError:
+            continue
+        HIGHLIGHT_CACHE[(col, None, aggregation)] = value
+for col in NON_NUMERIC_COLS:
+    grouped = data[col].groupby(data[col], observed=True)
+    for aggregation in AGGREGATIONS:
+        try:
+            per_value = grouped.agg(aggregation)
+        except TypeError:
+            continue
+        for value, result in per_value.items():
+            HIGHLIGHT_CACHE[(col, str(value), aggregation)] = result
+
+
+@functools.lru_cache(maxsize=None)
+def column_filter_options(column: str) -> tuple[dict, ...]:
+    """Options of the highlight card's column filter, built once per column"""
+    return tuple(
+        {"label": str(item), "value": str(item)} for item in unique_values(data, column)
+    )
+
+
 class HightlightCard(Card):
     title = "Highlight"
     description = "This card shows a highlight of a given dataset"
@@ -563,12 +1008,34 @@ class HightlightCard(Card):
         column_to_summarize = self.settings.get("column", "gender")
         aggregation = self.settings.get("aggregation", "count")
         filter_value = self.settings.get("column-filter", None)
-        filtered = data
-        if filter_value is not None:
-            filtered = data[data[column_to_summarize] == filter_value]
-        highlight_value = filtered[column_to_summarize].agg(aggregation)
-        if isinstance(highlight_value, float):
-            highlight_value = round(highlight_value, 2)
+        key = (column_to_summarize, filter_value, aggregation)
+        if key in HIGHLIGHT_CACHE:
+            highlight_value = HIGHLIGHT_CACHE[key]
+        else:
+            # Only the summarized column is needed, don't slice the whole table
+            values = data[column_to_summarize]
+            if filter_value is not None:
+                column = COL_ARR.get(column_to_summarize)
+                if column is not None and column.dtype.kind in "iuf":
+                    # Filter options are strings, parse the value into the
+                    # column's type and compare on the raw array
+                    try:
+                        values = values[column == column.dtype.type(filter_value)]
+                    except (ValueError, OverflowError):
+                        values = values.iloc[:0]
+                else:
+                    # pandas parses the string itself, e.g. for timedeltas
+                    values = values[values == filter_value]
+            try:
+                highlight_value = aggregate(values, aggregation)
+            except TypeError:
+                # e.g. the sum or mean of a text column
+                highlight_value = "-"
+        # Thousands separators, and two decimals for floats
+        if isinstance(highlight_value, (float, np.floating)):
+            highlight_value = f"{highlight_value:,.2f}"
+        elif isinstance(highlight_value, (int, np.integer)):
+            highlight_value = f"{highlight_value:,}"
         icon = self.settings.get("icon", "mdi:star")
         suffix = self.settings.get("suffix", "Number of participants")
         return (
@@ -617,9 +1084,7 @@ class HightlightCard(Card):
                     label="Column",
                     value=self.settings.get("column", "gender"),
                     searchable=True,
-                    data=[
-                        {"label": column, "value": column} for column in data.columns
-                    ],
+                    data=ALL_COL_OPTIONS,
                 ),
                 dmc.Select(
                     id={
@@ -630,10 +1095,7 @@ class HightlightCard(Card):
                     label="Column Filter",
                     value=self.settings.get("column-filter", None),
                     searchable=True,
-                    data=[
-                        {"label": str(item), "value": str(item)}
-                        for item in data["gender"].unique()
-                    ],
+                    data=GENDER_OPTIONS,
                     limit=10,
                 ),
                 dmc.Select(
@@ -645,13 +1107,7 @@ class HightlightCard(Card):
                     label="Aggregation",
                     value=self.settings.get("aggregation", "count"),
                     searchable=True,
-                    data=[
-                        {"label": "Count", "value": "count"},
-                        {"label": "Mean", "value": "mean"},
-                        {"label": "Sum", "value": "sum"},
-                        {"label": "Min", "value": "min"},
-                        {"label": "Max", "value": "max"},
-                    ],
+                    data=AGGREGATION_OPTIONS,
                 ),
                 dmc.TextInput(
                     id={
@@ -686,23 +1142,25 @@ class HightlightCard(Card):
         Input({"type": "card-settings", "id": MATCH, "sub-id": "column"}, "value"),
     )
     def update_column_filter(column):
-        return [
-            {"label": str(item), "value": str(item)} for item in data[column].unique()
-        ]
+        return column_filter_options(column)
 
-@callback(
+# Switching templates is purely visual, so do it in the browser. Both templates
+# are inlined into the function so no server round-trip is needed
+clientside_callback(
+    f"""
+    function(colorScheme, figures) {{
+        const template = colorScheme === "light"
+            ? {pio.json.to_json_plotly(pio.templates["mantine_light"])}
+            : {pio.json.to_json_plotly(pio.templates["mantine_dark"])};
+        return figures.map(
+            (figure) => ({{...figure, layout: {{...figure.layout, template}}}})
+        );
+    }}
+    """,
     Output({"type": "card-control", "sub-type": "figure", "id": ALL}, "figure"),
     Input("mantine-provider", "forceColorScheme"),
-    State({"type": "card-control", "sub-type": "figure", "id": ALL}, "id"),
+    State({"type": "card-control", "sub-type": "figure", "id": ALL}, "figure"),
 )
-def update_color_scheme(color_scheme, figure_ids):
-    template = pio.templates["mantine_light"] if color_scheme == "light" else pio.templates["mantine_dark"]
-    patched_figures = []
-    for _ in figure_ids:
-        patched_figure = Patch()
-        patched_figure["layout"]["template"] = template
-        patched_figures.append(patched_figure)
-    return patched_figures
 
 
 canvas = CardCanvas(settings)